@@ -1,9 +1,17 @@
-import yfinance as yf
 import pandas as pd
 import logging
 import os
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
+
+# Преобразование таймфрейма в формат yfinance
+TIMEFRAME_MAP = {
+    "MINUTE_1": "1m",
+    "MINUTE_5": "5m",
+    "MINUTE_15": "15m",
+    "HOUR_1": "1h",
+    "DAY": "1d"
+}
 
 def setup_logger() -> None:
     """Настройка логирования."""
@@ -16,53 +24,66 @@ def setup_logger() -> None:
         ]
     )
 
-def import_yfinance_data(symbol: str, timeframe: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
-    """Загрузка данных с Yahoo Finance."""
+def import_yfinance_batch(symbols: List[str], timeframe: str, start_date: str, end_date: str) -> Dict[str, pd.DataFrame]:
+    """Пакетная загрузка данных с Yahoo Finance для нескольких символов."""
     logger = logging.getLogger(__name__)
+    result = {}
     try:
-        # Преобразование таймфрейма в формат yfinance
-        timeframe_map = {
-            "MINUTE_1": "1m",
-            "MINUTE_5": "5m",
-            "MINUTE_15": "15m",
-            "HOUR_1": "1h",
-            "DAY": "1d"
-        }
-        yf_timeframe = timeframe_map.get(timeframe, "5m")
-        
-        # Загрузка данных
-        ticker = yf.Ticker(symbol)
-        df = ticker.history(
+        import yfinance as yf  # ленивый импорт: yfinance тянет requests/lxml при старте
+        yf_timeframe = TIMEFRAME_MAP.get(timeframe, "5m")
+
+        # Загрузка данных одним запросом (yfinance распараллеливает по потокам)
+        raw = yf.download(
+            symbols,
             start=start_date,
             end=end_date,
             interval=yf_timeframe,
+            group_by="ticker",
+            threads=True,
             auto_adjust=False,
-            prepost=False
+            prepost=False,
+            progress=False
         )
-        
-        if df.empty:
-            logger.warning(f"No data found for {symbol} on {timeframe}")
-            return None
-            
-        # Форматирование данных
-        df = df.reset_index()
-        df = df.rename(columns={
-            "Datetime": "timestamp",
-            "Open": "open",
-            "High": "high",
-            "Low": "low",
-            "Close": "close",
-            "Volume": "volume"
-        })
-        df["timestamp"] = df["timestamp"].dt.strftime("%Y-%m-%d %H:%M:%S")
-        df = df[["timestamp", "open", "high", "low", "close", "volume"]]
-        
-        logger.info(f"Imported {len(df)} rows for {symbol} on {timeframe}")
-        return df
-        
+
+        for symbol in symbols:
+            if isinstance(raw.columns, pd.MultiIndex):
+                if symbol not in raw.columns.get_level_values(0):
+                    logger.warning(f"No data found for {symbol} on {timeframe}")
+                    continue
+                df = raw[symbol]
+            else:
+                df = raw
+            df = df.dropna(how="all")
+
+            if df.empty:
+                logger.warning(f"No data found for {symbol} on {timeframe}")
+                continue
+
+            result[symbol] = _format_yfinance_frame(df)
+            logger.info(f"Imported {len(df)} rows for {symbol} on {timeframe}")
+
     except Exception as e:
         logger.error(f"Error importing data from Yahoo Finance: {e}")
-        return None
+    return result
+
+def import_yfinance_data(symbol: str, timeframe: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+    """Загрузка данных с Yahoo Finance."""
+    return import_yfinance_batch([symbol], timeframe, start_date, end_date).get(symbol)
+
+def _format_yfinance_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Приведение данных yfinance к формату timestamp,open,high,low,close,volume."""
+    df = df.rename_axis("timestamp").reset_index()
+    df = df.rename(columns={
+        "Open": "open",
+        "High": "high",
+        "Low": "low",
+        "Close": "close",
+        "Volume": "volume"
+    })
+    # Остаётся datetime в UTC: to_csv пишет ISO-8601 со смещением, без форматирования строк
+    timestamps = df["timestamp"]
+    df["timestamp"] = timestamps.dt.tz_localize("UTC") if timestamps.dt.tz is None else timestamps.dt.tz_convert("UTC")
+    return df[["timestamp", "open", "high", "low", "close", "volume"]]
 
 def save_data(df: pd.DataFrame, symbol: str, timeframe: str, output_dir: str = "data") -> None:
     """Сохранение данных в CSV."""
@@ -86,22 +107,24 @@ def main():
     logger = logging.getLogger(__name__)
     
     # Настройки
-    symbol = "XAUT-USD"  # Символ для Yahoo Finance
+    symbols = ["XAUT-USD"]  # Символы для Yahoo Finance
     timeframe = "MINUTE_5"  # Таймфрейм
     start_date = "2025-01-01"
     end_date = "2025-04-27"
     output_dir = "data"
     
-    logger.info(f"Starting data import for {symbol} ({timeframe}) from {start_date} to {end_date}")
+    logger.info(f"Starting data import for {', '.join(symbols)} ({timeframe}) from {start_date} to {end_date}")
     
     # Загрузка данных
-    df = import_yfinance_data(symbol, timeframe, start_date, end_date)
+    frames = import_yfinance_batch(symbols, timeframe, start_date, end_date)
     
-    if df is not None:
-        # Сохранение данных
-        save_data(df, symbol, timeframe, output_dir)
-    else:
-        logger.error("Failed to import data")
+    for symbol in symbols:
+        df = frames.get(symbol)
+        if df is not None:
+            # Сохранение данных
+            save_data(df, symbol, timeframe, output_dir)
+        else:
+            logger.error(f"Failed to import data for {symbol}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
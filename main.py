@@ -10,7 +10,6 @@ from src.order_manager import OrderManager
 from src.risk_manager import RiskManager
 from src.stop_loss_take_profit import StopLossTakeProfit
 from src.early_exit import EarlyExit
-from src.backtester import Backtester
 
 async def main():
     setup_logger()
@@ -23,6 +22,7 @@ async def main():
         api_secret=config["capital"]["api_secret"],
         account_id=config["capital"]["account_id"]
     )
+    await client.connect()
     data_feed = DataFeed(client)
     order_manager = OrderManager(client)
     risk_manager = RiskManager(
@@ -54,6 +54,9 @@ async def main():
     )
 
     if config["mode"] == "backtest":
+        # Импорт здесь: модуль бэктеста не нужен в live-режиме. numba загружается в обоих режимах —
+        # ядра стратегий и SL/TP компилируются при импорте, чтобы первый тик не ждал JIT
+        from src.backtester import Backtester
         backtester = Backtester(
             smc_strategy, ict_strategy, data_feed, order_manager, risk_manager,
             sl_tp_calculator, early_exit, config["backtest"]
@@ -67,6 +70,7 @@ async def main():
             initial_balance=config["trading"]["account_balance"]
         )
     else:
+        await data_feed.start_stream([smc_strategy.symbol], smc_strategy.timeframe)
         try:
             while True:
                 await smc_strategy.execute()
@@ -77,6 +81,10 @@ async def main():
             logger.info("Shutting down")
         except Exception as e:
             logger.error(f"Main loop error: {e}")
+        finally:
+            await data_feed.stop_stream()
+
+    await client.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -1,7 +1,15 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+import asyncio
 import logging
+import os
+import functools
+import hashlib
+import json
+import pickle
+import sys
+from numba import njit
+from pathlib import Path
 from typing import Dict, List, Optional
 from datetime import datetime
 from src.data_feed import DataFeed
@@ -12,6 +20,122 @@ from src.risk_manager import RiskManager
 from src.stop_loss_take_profit import StopLossTakeProfit
 from src.early_exit import EarlyExit
 
+_SLIPPAGE_CHUNK = 65536
+_RESULTS_DIR = Path("backtest")
+_SIGNAL_SOURCES = ("src.strategies.base", "src.strategies.smc", "src.strategies.ict",
+                   "src.stop_loss_take_profit", "src.risk_manager", __name__)
+
+def _read_history(csv_path: str, parquet_path: str) -> pd.DataFrame:
+    """Чтение истории: Parquet, если он свежее CSV, иначе CSV через pyarrow с записью Parquet."""
+    if os.path.exists(parquet_path) and (
+            not os.path.exists(csv_path) or os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path)):
+        return pd.read_parquet(parquet_path)
+
+    df = pd.read_csv(csv_path, engine="pyarrow", parse_dates=["timestamp"])
+    try:
+        df.to_parquet(parquet_path, index=False)
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"Failed to write Parquet cache {parquet_path}: {e}")
+    return df
+
+@functools.lru_cache(maxsize=1)
+def _signal_source_digest() -> str:
+    """Хэш исходников модулей, от которых зависят сигналы: их правка сама сбрасывает кэш сигналов."""
+    digest = hashlib.sha256()
+    for name in _SIGNAL_SOURCES:
+        digest.update(Path(sys.modules[name].__file__).read_bytes())
+    return digest.hexdigest()
+
+@functools.lru_cache(maxsize=32)
+def _load_history(csv_path: str, parquet_path: str, start_date: str, end_date: str,
+                  mtime: float) -> pd.DataFrame:
+    """История за период; результат кэшируется в памяти (не изменять возвращённый DataFrame)."""
+    df = _read_history(csv_path, parquet_path)
+    # Границы в поясе колонки: новые выгрузки хранят UTC, старые CSV — наивное время
+    tz = df["timestamp"].dt.tz
+    start, end = pd.Timestamp(start_date, tz=tz), pd.Timestamp(end_date, tz=tz)
+    df = df[(df["timestamp"] >= start) & (df["timestamp"] <= end)]
+    return df[["timestamp", "open", "high", "low", "close", "volume"]]
+
+# Строка закрытой сделки: direction 1 — BUY, 0 — SELL; pos — индекс позиции в open_positions
+_TRADE_DTYPE = np.dtype([
+    ("pos", "i8"), ("direction", "u1"), ("entry", "f8"), ("exit", "f8"), ("size", "f8"),
+    ("profit", "f8"), ("open_idx", "i8"), ("close_idx", "i8")
+])
+
+@njit(cache=True)
+def _simulate_trades_nb(close_arr: np.ndarray, entries: np.ndarray, is_buy: np.ndarray,
+                        entry_prices: np.ndarray, sls: np.ndarray, tps: np.ndarray, sizes: np.ndarray,
+                        net_rate: float, exit_buy: np.ndarray, exit_sell: np.ndarray,
+                        min_profit_percent: float, trades: np.ndarray) -> int:
+    """Один проход по барам: SL/TP и досрочный выход; закрытые сделки пишутся в trades, возвращает их число."""
+    n = close_arr.shape[0]
+    m = entries.shape[0]
+    open_slots = np.empty(m, dtype=np.int64)
+    n_open = 0
+    n_trades = 0
+    k = 0
+    for i in range(n):
+        # Открытие позиций, выставленных на этом баре
+        while k < m and entries[k] <= i:
+            open_slots[n_open] = k
+            n_open += 1
+            k += 1
+
+        # Обход в обратном порядке: закрытая позиция заменяется последней (swap-pop)
+        price = close_arr[i]
+        for j in range(n_open - 1, -1, -1):
+            p = open_slots[j]
+            hit = False
+            level = 0.0
+            if is_buy[p]:
+                if price <= sls[p]:
+                    level = sls[p]
+                    hit = True
+                elif price >= tps[p]:
+                    level = tps[p]
+                    hit = True
+                elif exit_buy[i] and (price - entry_prices[p]) / entry_prices[p] * 100 >= min_profit_percent:
+                    level = price  # досрочный выход по риску смены тренда
+                    hit = True
+                profit = (level - entry_prices[p]) * sizes[p]
+            else:  # SELL
+                if price >= sls[p]:
+                    level = sls[p]
+                    hit = True
+                elif price <= tps[p]:
+                    level = tps[p]
+                    hit = True
+                elif exit_sell[i] and (entry_prices[p] - price) / entry_prices[p] * 100 >= min_profit_percent:
+                    level = price
+                    hit = True
+                profit = (entry_prices[p] - level) * sizes[p]
+
+            if hit:
+                row = trades[n_trades]
+                row.pos = p
+                row.direction = is_buy[p]
+                row.entry = entry_prices[p]
+                row.exit = price
+                row.size = sizes[p]
+                row.profit = profit * net_rate
+                row.open_idx = entries[p]
+                row.close_idx = i
+                n_trades += 1
+                n_open -= 1
+                open_slots[j] = open_slots[n_open]
+    return n_trades
+
+class WindowedFeed:
+    """Источник данных для бэктеста: история до текущего бара вместо запроса к API."""
+    def __init__(self, data: pd.DataFrame):
+        self.data = data
+        self.end_idx = 0
+
+    def get_data(self, *args, **kwargs) -> pd.DataFrame:
+        # Синхронный: в режиме backtest стратегии вызывают get_data без await
+        return self.data.iloc[:self.end_idx + 1]
+
 class Backtester:
     def __init__(self, smc_strategy: SMCStrategy, ict_strategy: ICTStrategy, data_feed: DataFeed,
                  order_manager: OrderManager, risk_manager: RiskManager, sl_tp_calculator: StopLossTakeProfit,
@@ -26,8 +150,16 @@ class Backtester:
         self.config = config
         self.logger = logging.getLogger(__name__)
         self.equity = []
-        self.trades = []
+        self.trades = pd.DataFrame()
+        self._trades_arr = np.empty(0, dtype=_TRADE_DTYPE)
+        self._n_trades = 0
         self.open_positions = []
+        self._bar_idx = 0
+        self._bar_time = None
+        self._net_rate = 1 - config["commission"]  # доля прибыли после комиссии
+        self._rng = np.random.default_rng(config.get("slippage_seed"))
+        self._slippage_pool = np.empty(0)
+        self._slip_i = 0
 
     async def run(self, start_date: str, end_date: str, initial_balance: float) -> None:
         """Запуск бэктестинга с учётом спредов, проскальзывания и комиссий."""
@@ -43,151 +175,221 @@ class Backtester:
                 self.logger.error("No data for backtesting")
                 return
 
-            # Основной цикл
-            for i in range(1, len(data)):
-                window = data.iloc[:i+1]
-                current_price = data.iloc[i]["close"]
-                current_time = data.iloc[i]["timestamp"]
-
-                if len(window) < max(
-                    self.sl_tp_calculator.config["atr_period"],
-                    self.sl_tp_calculator.config["sr_window"]
-                ):
-                    print(f"Window too small: {len(window)}")
-                    continue
-
-                # Подмена data_feed для стратегий
-                self.smc_strategy.data_feed.get_data = lambda *args, **kwargs: window
-                self.ict_strategy.data_feed.get_data = lambda *args, **kwargs: window
-                self.early_exit.data_feed.get_data = lambda *args, **kwargs: window
-
-                # Выполнение стратегий
-                await self.smc_strategy.execute()
-                await self.ict_strategy.execute()
-
-                # Проверка открытых позиций
-                await self._process_positions(current_price, current_time, window)
+            # Предварительный проход: генерация сигналов стратегий
+            min_window = max(
+                self.sl_tp_calculator.config["atr_period"],
+                self.sl_tp_calculator.config["sr_window"]
+            )
+            start = max(1, min_window - 1)
+            cache_path = self._signal_cache_path(start_date, end_date)
+            cached = self._load_cached_signals(cache_path) if cache_path else None
+            if cached is None:
+                await self._generate_signals(data, start)
+                if cache_path:
+                    self._save_cached_signals(cache_path)
+            else:
+                self.open_positions = cached
+            self._fill_positions()
 
-                # Проверка досрочного выхода
-                # await self.early_exit.check_positions(self.smc_strategy.symbol, self.smc_strategy.timeframe)
+            # Проверка открытых позиций (векторно по всей истории)
+            closes = data["close"].to_numpy(dtype=np.float64)
+            if self.config.get("early_exit", False):
+                exit_buy, exit_sell = self.early_exit.exit_flags(data)
+            else:
+                exit_buy = exit_sell = np.zeros(len(data), dtype=np.bool_)
+            pnl_by_bar = self._process_positions(closes, data["timestamp"], exit_buy, exit_sell)
 
-                # Обновление баланса
-                balance = self.risk_manager.account_balance
-                self.equity.append(balance)
+            # Кривая эквити: баланс после каждого бара
+            equity = initial_balance + np.cumsum(pnl_by_bar)[start:]
+            self.equity.extend(equity.tolist())
+            balance = self.equity[-1]
+            self.risk_manager.update_balance(balance)
 
             # Закрытие всех позиций в конце
-            await self._close_all_positions(data.iloc[-1]["close"])
+            await self._close_all_positions(closes[-1], data["timestamp"].iat[-1])
 
-            # Сохранение результатов
-            self._save_results()
-            self._calculate_metrics()
-            self._plot_equity_curve()
+            # Сохранение результатов: запись файлов параллельно в фоновых потоках
+            _RESULTS_DIR.mkdir(exist_ok=True)
+            await asyncio.gather(
+                self._save_results(),
+                asyncio.to_thread(self._calculate_metrics),
+                asyncio.to_thread(self._plot_equity_curve)
+            )
             self.logger.info(f"Backtest completed. Final balance: {balance}")
 
         except Exception as e:
             self.logger.error(f"Backtest error: {e}")
 
     def _load_data(self, start_date: str, end_date: str) -> pd.DataFrame:
-        """Загрузка исторических данных из CSV."""
+        """Загрузка исторических данных из CSV (с кэшем в Parquet)."""
         try:
             symbol = self.smc_strategy.symbol
             timeframe = self.smc_strategy.timeframe
             file_path = f"data/{symbol}_{timeframe}.csv"
-            df = pd.read_csv(file_path)
-            df["timestamp"] = pd.to_datetime(df["timestamp"])
-            df = df[(df["timestamp"] >= start_date) & (df["timestamp"] <= end_date)]
+            parquet_path = f"data/{symbol}_{timeframe}.parquet"
+            mtime = os.path.getmtime(file_path if os.path.exists(file_path) else parquet_path)
+            df = _load_history(file_path, parquet_path, start_date, end_date, mtime)
             if df.empty:
                 self.logger.warning(f"No data found in {file_path} for specified period")
-            return df[["timestamp", "open", "high", "low", "close", "volume"]]
+            return df
         except Exception as e:
             self.logger.error(f"Error loading data: {e}")
             return pd.DataFrame()
 
-    async def place_order(self, symbol: str, direction: str, size: float, price: float,
-                          stop_loss: float, take_profit: float) -> None:
-        """Симуляция размещения ордера с учётом спреда и проскальзывания."""
+    def _signal_cache_path(self, start_date: str, end_date: str) -> Optional[str]:
+        """Путь к дисковому кэшу сигналов; ключ — хэш данных, параметров и исходников стратегий. None — кэш отключён."""
+        cache_dir = self.config.get("cache_dir", "cache")
+        if not cache_dir:
+            return None
+        symbol = self.smc_strategy.symbol
+        timeframe = self.smc_strategy.timeframe
+        file_path = f"data/{symbol}_{timeframe}.csv"
+        if not os.path.exists(file_path):
+            file_path = f"data/{symbol}_{timeframe}.parquet"
+        key = {
+            "source": _signal_source_digest(),
+            "symbol": symbol,
+            "timeframe": timeframe,
+            "start_date": start_date,
+            "end_date": end_date,
+            "data_mtime": os.path.getmtime(file_path),
+            "smc": self.smc_strategy.config,
+            "ict": self.ict_strategy.config,
+            "sl_tp": self.sl_tp_calculator.config,
+            "max_risk_per_trade": self.risk_manager.max_risk_per_trade,
+            "risk_balance": self.risk_manager.intitial_balance
+        }
+        digest = hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+        return os.path.join(cache_dir, f"{digest}.pkl")
+
+    def _load_cached_signals(self, cache_path: str) -> Optional[List[Dict]]:
+        """Чтение сигналов из дискового кэша."""
+        if not os.path.exists(cache_path):
+            return None
         try:
-            # Учёт спреда
-            spread = self.config["spread"]  # Например, 0.00015 для EURUSD
-            if direction.upper() == "BUY":
-                entry_price = price + spread / 2
-            else:
-                entry_price = price - spread / 2
+            with open(cache_path, "rb") as f:
+                positions = pickle.load(f)
+            self.logger.info(f"Loaded {len(positions)} cached signals from {cache_path}")
+            return positions
+        except Exception as e:
+            self.logger.warning(f"Failed to read signal cache {cache_path}: {e}")
+            return None
 
-            # Учёт проскальзывания
-            slippage = self._calculate_slippage()
-            entry_price += slippage if direction.upper() == "BUY" else -slippage
+    def _save_cached_signals(self, cache_path: str) -> None:
+        """Запись сигналов (до учёта спреда и проскальзывания) в дисковый кэш."""
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(cache_path, "wb") as f:
+                pickle.dump(self.open_positions, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            self.logger.warning(f"Failed to write signal cache {cache_path}: {e}")
 
+    async def place_order(self, symbol: str, direction: str, size: float, price: float,
+                          stop_loss: float, take_profit: float) -> None:
+        """Симуляция размещения ордера (спред и проскальзывание учитываются в _fill_positions)."""
+        try:
             # Сохранение позиции
             position = {
                 "symbol": symbol,
                 "direction": direction.upper(),
+                "is_buy": direction.upper() == "BUY",
                 "size": size,
-                "entry_price": entry_price,
+                "price": price,
                 "stop_loss": stop_loss,
                 "take_profit": take_profit,
-                "open_time": datetime.now(),
+                "open_time": self._bar_time,
+                "open_idx": self._bar_idx,
                 "deal_id": f"BACKTEST_{len(self.open_positions)}"
             }
             self.open_positions.append(position)
-            self.logger.info(f"Backtest order placed: {position}")
+            self.logger.info("Backtest order placed: %s", position)
 
         except Exception as e:
             self.logger.error(f"Error placing backtest order: {e}")
 
-    async def _process_positions(self, current_price: float, current_time: datetime, data: pd.DataFrame) -> None:
-        """Обработка открытых позиций (проверка SL/TP)."""
-        for pos in self.open_positions[:]:
-            profit = 0
-            close_position = False
-
-            # self.logger.info(f"Profit error: stop_loss:{pos['stop_loss']} take_profit:{pos['take_profit']} entry_price:{pos['entry_price']} size:{pos['size']}")
-
-            # Проверка SL/TP
-            if pos["direction"] == "BUY":
-                if current_price <= pos["stop_loss"]:
-                    profit = (pos["stop_loss"] - pos["entry_price"]) * pos["size"]
-                    close_position = True
-                elif current_price >= pos["take_profit"]:
-                    profit = (pos["take_profit"] - pos["entry_price"]) * pos["size"]
-                    close_position = True
-            else:  # SELL
-                if current_price >= pos["stop_loss"]:
-                    profit = (pos["entry_price"] - pos["stop_loss"]) * pos["size"]
-                    close_position = True
-                elif current_price <= pos["take_profit"]:
-                    profit = (pos["entry_price"] - pos["take_profit"]) * pos["size"]
-                    close_position = True
-
-            # Учёт комиссий
-            if close_position:
-                profit *= 1 - self.config["commission"]
-                self.trades.append({
-                    "symbol": pos["symbol"],
-                    "direction": pos["direction"],
-                    "entry_price": pos["entry_price"],
-                    "exit_price": current_price,
-                    "size": pos["size"],
-                    "profit": profit,
-                    "open_time": pos["open_time"],
-                    "close_time": current_time
-                })
-                self.risk_manager.update_balance(self.risk_manager.account_balance + profit)
-                self.open_positions.remove(pos)
+    def _fill_positions(self) -> None:
+        """Цены входа с учётом спреда и проскальзывания."""
+        half_spread = self.config["spread"] / 2  # Например, 0.00015 для EURUSD
+        for pos in self.open_positions:
+            # Учёт спреда и проскальзывания
+            slippage = self._calculate_slippage()
+            if pos["is_buy"]:
+                pos["entry_price"] = pos["price"] + half_spread + slippage
+            else:
+                pos["entry_price"] = pos["price"] - half_spread - slippage
+
+    async def _generate_signals(self, data: pd.DataFrame, start: int) -> None:
+        """Прогон стратегий по истории; ордера копятся в open_positions."""
+        timestamps = data["timestamp"]
+        feed = WindowedFeed(data)
+        original_feeds = (self.smc_strategy.data_feed, self.ict_strategy.data_feed, self.early_exit.data_feed)
+        self.smc_strategy.data_feed = self.ict_strategy.data_feed = self.early_exit.data_feed = feed
+        try:
+            for i in range(start, len(data)):
+                feed.end_idx = i
+                self._bar_idx = i
+                self._bar_time = timestamps.iat[i]
+
+                await self.smc_strategy.execute()
+                await self.ict_strategy.execute()
+        finally:
+            self.smc_strategy.data_feed, self.ict_strategy.data_feed, self.early_exit.data_feed = original_feeds
+
+    def _process_positions(self, closes: np.ndarray, timestamps: pd.Series,
+                           exit_buy: np.ndarray, exit_sell: np.ndarray) -> np.ndarray:
+        """Обработка позиций JIT-ядром (SL/TP и досрочный выход), возвращает прибыль по барам."""
+        n = len(closes)
+        count = len(self.open_positions)
+        entries = np.fromiter((p["open_idx"] for p in self.open_positions), np.int64, count)
+        is_buy = np.fromiter((p["is_buy"] for p in self.open_positions), np.bool_, count)
+        entry_prices = np.fromiter((p["entry_price"] for p in self.open_positions), np.float64, count)
+        stop_losses = np.fromiter((p["stop_loss"] for p in self.open_positions), np.float64, count)
+        take_profits = np.fromiter((p["take_profit"] for p in self.open_positions), np.float64, count)
+        sizes = np.fromiter((p["size"] for p in self.open_positions), np.float64, count)
 
+        # Каждая позиция закрывается не более одного раза — этого размера достаточно
+        self._trades_arr = np.empty(count, dtype=_TRADE_DTYPE)
+        self._n_trades = _simulate_trades_nb(
+            closes, entries, is_buy, entry_prices, stop_losses, take_profits, sizes, self._net_rate,
+            exit_buy, exit_sell, self.early_exit.config.get("min_profit_percent", 0.1), self._trades_arr
+        )
+        arr = self._trades_arr[:self._n_trades]
+        arr.sort(order=["close_idx", "pos"])  # внутри бара — в порядке открытия
+
+        self.trades = pd.DataFrame({
+            "symbol": [self.open_positions[k]["symbol"] for k in arr["pos"]],
+            "direction": np.where(arr["direction"], "BUY", "SELL"),
+            "entry_price": arr["entry"],
+            "exit_price": arr["exit"],
+            "size": arr["size"],
+            "profit": arr["profit"],
+            "open_time": timestamps.array[arr["open_idx"]],
+            "close_time": timestamps.array[arr["close_idx"]]
+        })
+        if self.logger.isEnabledFor(logging.INFO):  # цикл только ради логов — пропускаем, если INFO выключен
+            for k, profit in zip(arr["pos"], arr["profit"]):
+                pos = self.open_positions[k]
                 if profit == 0.0:
-                    self.logger.info(f"Profit error: stop_loss:{pos['stop_loss']} take_profit:{pos['take_profit']} entry_price:{pos['entry_price']} size:{pos['size']}")
+                    self.logger.info("Profit error: stop_loss:%s take_profit:%s entry_price:%s size:%s",
+                                     pos["stop_loss"], pos["take_profit"], pos["entry_price"], pos["size"])
+
+                self.logger.info("Position closed: %s, Profit: %s", pos["deal_id"], profit)
 
-                self.logger.info(f"Position closed: {pos['deal_id']}, Profit: {profit}")
+        pnl_by_bar = np.bincount(arr["close_idx"], weights=arr["profit"], minlength=n)
+        still_open = np.ones(count, dtype=np.bool_)
+        still_open[arr["pos"]] = False
+        self.open_positions = [pos for pos, is_open in zip(self.open_positions, still_open) if is_open]
+        return pnl_by_bar
 
-    async def _close_all_positions(self, current_price: float) -> None:
+    async def _close_all_positions(self, current_price: float, current_time: datetime) -> None:
         """Закрытие всех открытых позиций в конце бэктеста."""
-        for pos in self.open_positions[:]:
-            profit = (current_price - pos["entry_price"]) * pos["size"] if pos["direction"] == "BUY" else \
+        closed_trades = []
+        for pos in self.open_positions:
+            profit = (current_price - pos["entry_price"]) * pos["size"] if pos["is_buy"] else \
                      (pos["entry_price"] - current_price) * pos["size"]
             commission = pos["size"] * self.config["commission"]
             profit -= commission
-            self.trades.append({
+            closed_trades.append({
                 "symbol": pos["symbol"],
                 "direction": pos["direction"],
                 "entry_price": pos["entry_price"],
@@ -195,28 +397,38 @@ class Backtester:
                 "size": pos["size"],
                 "profit": profit,
                 "open_time": pos["open_time"],
-                "close_time": datetime.now()
+                "close_time": current_time
             })
             print(f"account_balance:  {self.risk_manager.account_balance + profit} | profit: {self.risk_manager.account_balance + profit}")
             self.risk_manager.update_balance(self.risk_manager.account_balance + profit)
-            self.open_positions.remove(pos)
-            self.logger.info(f"Position closed at end: {pos['deal_id']}, Profit: {profit}")
+            self.logger.info("Position closed at end: %s, Profit: %s", pos["deal_id"], profit)
+        self.open_positions.clear()
+        if closed_trades:
+            self.trades = pd.concat([self.trades, pd.DataFrame(closed_trades)], ignore_index=True)
 
     def _calculate_slippage(self) -> float:
-        """Рассчёт проскальзывания (случайное отклонение)."""
-        volatility = self.config["slippage_volatility"]  # Например, 0.0001
-        return np.random.normal(0, volatility)
+        """Рассчёт проскальзывания (случайное отклонение из заранее сгенерированного пула)."""
+        if self._slip_i >= len(self._slippage_pool):
+            volatility = self.config["slippage_volatility"]  # Например, 0.0001
+            self._slippage_pool = self._rng.normal(0, volatility, size=_SLIPPAGE_CHUNK)
+            self._slip_i = 0
+        slippage = self._slippage_pool[self._slip_i]
+        self._slip_i += 1
+        return slippage
 
     def _calculate_metrics(self) -> None:
         """Рассчёт метрик производительности."""
         try:
-            equity_series = pd.Series(self.equity)
-            returns = equity_series.pct_change().dropna()
-            total_trades = len(self.trades)
-            win_trades = sum(1 for t in self.trades if t["profit"] > 0)
-            win_rate = win_trades / total_trades if total_trades > 0 else 0
-            max_drawdown = (equity_series / equity_series.cummax() - 1).min()
-            sharpe_ratio = returns.mean() / returns.std() * np.sqrt(252) if returns.std() != 0 else 0
+            equity = np.asarray(self.equity, dtype=np.float64)
+            returns = np.diff(equity) / equity[:-1]
+            profits = self.trades["profit"].to_numpy(dtype=np.float64)
+            total_trades = len(profits)
+            win_rate = (profits > 0).mean() if total_trades > 0 else 0
+            max_drawdown = (equity / np.maximum.accumulate(equity) - 1).min()
+            returns_std = returns.std(ddof=1) if len(returns) > 1 else np.nan
+            sharpe_ratio = returns.mean() / returns_std * np.sqrt(252) if returns_std != 0 else 0
+            gross_win = profits[profits > 0].sum()
+            gross_loss = -profits[profits < 0].sum()
 
             metrics = {
                 "total_trades": total_trades,
@@ -224,35 +436,37 @@ class Backtester:
                 "max_drawdown": max_drawdown,
                 "sharpe_ratio": sharpe_ratio,
                 "final_balance": self.equity[-1],
-                "profit_factor": sum(t["profit"] for t in self.trades if t["profit"] > 0) / \
-                                 abs(sum(t["profit"] for t in self.trades if t["profit"] < 0)) if any(t["profit"] < 0 for t in self.trades) else float("inf")
+                "profit_factor": gross_win / gross_loss if (profits < 0).any() else float("inf")
             }
-            pd.DataFrame([metrics]).to_csv("backtest/backtest_metrics.csv")
+            pd.DataFrame([metrics]).to_csv(_RESULTS_DIR / "backtest_metrics.csv")
             self.logger.info(f"Metrics: {metrics}")
         except Exception as e:
             self.logger.error(f"Error calculating metrics: {e}")
 
     def _plot_equity_curve(self) -> None:
-        """Построение графика эквити."""
+        """Построение графика эквити (Figure рисуется Agg напрямую, без pyplot и GUI-бэкенда)."""
         try:
-            plt.figure(figsize=(10, 6))
-            plt.plot(self.equity, label="Equity")
-            plt.title("Backtest Equity Curve")
-            plt.xlabel("Trade")
-            plt.ylabel("Balance")
-            plt.legend()
-            plt.grid(True)
-            plt.savefig("backtest/equity_curve.png")
-            plt.close()
+            from matplotlib.figure import Figure  # ленивый импорт: matplotlib нужен только для графика
+            fig = Figure(figsize=(10, 6))
+            ax = fig.subplots()
+            ax.plot(self.equity, label="Equity")
+            ax.set_title("Backtest Equity Curve")
+            ax.set_xlabel("Trade")
+            ax.set_ylabel("Balance")
+            ax.legend()
+            ax.grid(True)
+            fig.savefig(_RESULTS_DIR / "equity_curve.png")
             self.logger.info("Equity curve saved to equity_curve.png")
         except Exception as e:
             self.logger.error(f"Error plotting equity curve: {e}")
 
-    def _save_results(self) -> None:
-        """Сохранение результатов бэктестинга."""
+    async def _save_results(self) -> None:
+        """Сохранение результатов бэктестинга (файлы пишутся параллельно)."""
         try:
-            pd.Series(self.equity).to_csv("backtest/backtest_equity.csv")
-            pd.DataFrame(self.trades).to_csv("backtest/backtest_trades.csv")
+            await asyncio.gather(
+                asyncio.to_thread(pd.Series(self.equity).to_csv, _RESULTS_DIR / "backtest_equity.csv"),
+                asyncio.to_thread(self.trades.to_csv, _RESULTS_DIR / "backtest_trades.csv")
+            )
             self.logger.info("Backtest results saved to backtest_equity.csv and backtest_trades.csv")
         except Exception as e:
             self.logger.error(f"Failed to save backtest results: {e}")
\ No newline at end of file
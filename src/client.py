@@ -1,23 +1,42 @@
-import requests
+import httpx
+import asyncio
 import logging
-from typing import Dict, List, Optional
+import orjson
+import websockets
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
 from tenacity import retry, stop_after_attempt, wait_exponential
 
+_HEARTBEAT_INTERVAL = 25  # секунд между ping в потоке цен
+_MAX_MISSED_PONGS = 2
+_RECONNECT_DELAY = 5
+
 class CapitalClient:
     def __init__(self, api_key: str, api_secret: str, account_id: str):
         self.api_key = api_key
         self.api_secret = api_secret
         self.account_id = account_id
         self.base_url = "https://demo-api-capital.backend-capital.com/api/v1"
-        self.session = requests.Session()
-        self.session.headers.update({"X-CAP-API-KEY": self.api_key})
+        self.stream_url = "wss://api-streaming-capital.backend-capital.com/connect"
+        self.session = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=20),
+            timeout=5.0,
+            headers={"X-CAP-API-KEY": self.api_key}
+        )
         self.logger = logging.getLogger(__name__)
-        self._authenticate()
+
+    async def connect(self) -> None:
+        """Аутентификация сессии (вызывается один раз после создания клиента)."""
+        await self._authenticate()
+
+    async def close(self) -> None:
+        """Закрытие HTTP-соединений."""
+        await self.session.aclose()
 
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-    def _authenticate(self) -> None:
+    async def _authenticate(self) -> None:
         try:
-            response = self.session.post(
+            response = await self.session.post(
                 f"{self.base_url}/session",
                 json={
                     "identifier": self.account_id, 
@@ -36,20 +55,20 @@ class CapitalClient:
             raise
 
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-    def get_market_data(self, symbol: str, timeframe: str, limit: int = 100) -> List[Dict]:
+    async def get_market_data(self, symbol: str, timeframe: str, limit: int = 100) -> List[Dict]:
         try:
-            response = self.session.get(
+            response = await self.session.get(
                 f"{self.base_url}/prices/{symbol}",
                 params={"resolution": timeframe, "max": limit}
             )
             response.raise_for_status()
-            return response.json().get("prices", [])
+            return orjson.loads(response.content).get("prices", [])
         except Exception as e:
             self.logger.error(f"Failed to fetch market data: {e}")
             return []
 
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-    def place_order(self, symbol: str, direction: str, size: float, price: Optional[float] = None,
+    async def place_order(self, symbol: str, direction: str, size: float, price: Optional[float] = None,
                     stop_loss: Optional[float] = None, take_profit: Optional[float] = None) -> Dict:
         
         payload = {
@@ -68,21 +87,101 @@ class CapitalClient:
 
         response = None
         try:
-            response = self.session.post(f"{self.base_url}/workingorders", json=payload)
+            response = await self.session.post(f"{self.base_url}/workingorders", json=payload)
             response.raise_for_status()
-            self.logger.info(f"Order placed: {payload}")
-            return response.json()
+            self.logger.info("Order placed: %s", payload)
+            return orjson.loads(response.content)
         except Exception as e:
             self.logger.error(f"Failed to place order: {e}")
             self.logger.error(response.content)
             self.logger.error(payload)
             return {}
 
-    def get_account_balance(self) -> float:
+    async def get_account_balance(self) -> float:
         try:
-            response = self.session.get(f"{self.base_url}/accounts/{self.account_id}")
+            response = await self.session.get(f"{self.base_url}/accounts/{self.account_id}")
             response.raise_for_status()
-            return response.json().get("balance", {}).get("available", 0.0)
+            return orjson.loads(response.content).get("balance", {}).get("available", 0.0)
         except Exception as e:
             self.logger.error(f"Failed to fetch balance: {e}")
-            return 0.0
\ No newline at end of file
+            return 0.0
+
+    async def get_positions(self) -> List[Dict]:
+        """Открытые позиции счёта (ошибки обрабатывает вызывающий код)."""
+        response = await self.session.get(f"{self.base_url}/positions")
+        response.raise_for_status()
+        return orjson.loads(response.content).get("positions", [])
+
+    async def delete_position(self, position_id: str) -> None:
+        """Закрытие позиции по ID (ошибки обрабатывает вызывающий код)."""
+        response = await self.session.delete(f"{self.base_url}/positions/{position_id}")
+        response.raise_for_status()
+
+    async def stream_prices(self, symbols: List[str], timeframe: str,
+                            on_connect: Optional[Callable[[], Awaitable[None]]] = None,
+                            on_disconnect: Optional[Callable[[], None]] = None) -> AsyncIterator[Dict]:
+        """Поток OHLC-свечей по WebSocket с heartbeat и автоматическим переподключением.
+
+        on_connect вызывается после каждой подписки (для догрузки пропущенных свечей),
+        on_disconnect — при каждом разрыве соединения.
+        """
+        while True:
+            try:
+                async with websockets.connect(self.stream_url) as ws:
+                    await ws.send(orjson.dumps(self._stream_message(
+                        "OHLCMarketData.subscribe",
+                        {"epics": symbols, "resolutions": [timeframe], "type": "classic"}
+                    )).decode())
+                    self.logger.info(f"Subscribed to price stream: {symbols} {timeframe}")
+                    heartbeat_state = {"missed": 0}
+                    heartbeat = asyncio.create_task(self._heartbeat(ws, heartbeat_state))
+                    try:
+                        if on_connect is not None:
+                            await on_connect()
+                        async for message in ws:
+                            # Битое сообщение пропускается, а не обрывает поток
+                            try:
+                                msg = orjson.loads(message)
+                                destination = msg.get("destination")
+                                payload = msg["payload"] if destination == "ohlc.event" else None
+                            except (orjson.JSONDecodeError, KeyError, AttributeError) as e:
+                                self.logger.warning(f"Skipping malformed stream message: {e}")
+                                continue
+                            if payload is not None:
+                                yield payload
+                            elif destination == "ping":
+                                heartbeat_state["missed"] = 0
+                    finally:
+                        heartbeat.cancel()
+            except (websockets.WebSocketException, OSError) as e:
+                self.logger.error(f"Price stream error: {e}")
+            if on_disconnect is not None:
+                on_disconnect()
+            self.logger.info("Reconnecting price stream")
+            await asyncio.sleep(_RECONNECT_DELAY)
+
+    async def _heartbeat(self, ws, state: Dict) -> None:
+        """Ping каждые 25 с; разрыв соединения после двух ping без ответа."""
+        try:
+            while True:
+                await asyncio.sleep(_HEARTBEAT_INTERVAL)
+                if state["missed"] >= _MAX_MISSED_PONGS:
+                    self.logger.warning("Price stream heartbeat lost, closing connection")
+                    await ws.close()
+                    return
+                state["missed"] += 1
+                await ws.send(orjson.dumps(self._stream_message("ping")).decode())
+        except websockets.ConnectionClosed:
+            # Соединение уже закрыто — разрыв обработает цикл чтения в stream_prices
+            return
+
+    def _stream_message(self, destination: str, payload: Optional[Dict] = None) -> Dict:
+        message = {
+            "destination": destination,
+            "correlationId": destination,
+            "cst": self.session.headers.get("CST"),
+            "securityToken": self.session.headers.get("X-SECURITY-TOKEN")
+        }
+        if payload is not None:
+            message["payload"] = payload
+        return message
\ No newline at end of file
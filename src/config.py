@@ -1,8 +1,11 @@
 import yaml
 import logging
+import functools
 from typing import Dict, Any
 
+@functools.lru_cache(maxsize=8)
 def load_config(file_path: str) -> Dict[str, Any]:
+    """Чтение конфигурации один раз на процесс; возвращается общий словарь — только для чтения."""
     logger = logging.getLogger(__name__)
     try:
         with open(file_path, "r") as f:
@@ -1,28 +1,187 @@
 import pandas as pd
+import numpy as np
+import asyncio
 import logging
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 from src.client import CapitalClient
 
+_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+_VOLUME_REFRESH_BARS = 3  # сколько последних свечей дополнять объёмом из REST
+
+def _bid(price: Optional[Dict]) -> float:
+    """Цена bid из объекта цены Capital.com (NaN, если её нет)."""
+    if isinstance(price, dict):
+        bid = price.get("bid")
+        if bid is not None:
+            return bid
+    return np.nan
+
+def _volume(raw: Dict) -> float:
+    """Объём свечи (NaN, если его нет, — как и у цен)."""
+    volume = raw.get("lastTradedVolume")
+    return np.nan if volume is None else volume
+
+class _CandleRing:
+    """Кольцевой буфер свечей по колонкам (SoA). Каждая запись дублируется во второй половине
+    массивов, поэтому последние N свечей всегда лежат непрерывным срезом."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.timestamp = np.empty(2 * capacity, dtype="datetime64[ns]")
+        self.columns = {col: np.empty(2 * capacity, dtype=np.float64) for col in _COLUMNS[1:]}
+        self._count = 0  # всего записано свечей
+        # Объёмы по REST запрашиваются один раз на свечу; одновременные вызовы get_data ждут общий запрос
+        self.volumes_refreshed_at: Optional[np.datetime64] = None
+        self.volume_refresh: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
+
+    def last_timestamp(self) -> Optional[np.datetime64]:
+        if self._count == 0:
+            return None
+        return self.timestamp[(self._count - 1) % self.capacity]
+
+    def push(self, timestamp, open_: float, high: float, low: float, close: float, volume: float) -> None:
+        """Добавление новой свечи за O(1), старейшая вытесняется."""
+        pos = self._count % self.capacity
+        for p in (pos, pos + self.capacity):
+            self.timestamp[p] = timestamp
+            self.columns["open"][p] = open_
+            self.columns["high"][p] = high
+            self.columns["low"][p] = low
+            self.columns["close"][p] = close
+            self.columns["volume"][p] = volume
+        self._count += 1
+
+    def update_last(self, open_: float, high: float, low: float, close: float) -> None:
+        """Обновление цен текущей свечи (объём сохраняется)."""
+        pos = (self._count - 1) % self.capacity
+        for p in (pos, pos + self.capacity):
+            self.columns["open"][p] = open_
+            self.columns["high"][p] = high
+            self.columns["low"][p] = low
+            self.columns["close"][p] = close
+
+    def set_volumes(self, timestamps: np.ndarray, volumes: np.ndarray) -> None:
+        """Объём свечей с указанным временем (свечи, которых нет в буфере, пропускаются)."""
+        n = len(self)
+        start = (self._count - 1) % self.capacity + self.capacity + 1 - n
+        window = self.timestamp[start:start + n]
+        for i, timestamp, volume in zip(np.searchsorted(window, timestamps), timestamps, volumes):
+            if i < n and window[i] == timestamp:
+                pos = (start + i) % self.capacity
+                self.columns["volume"][pos] = volume
+                self.columns["volume"][pos + self.capacity] = volume
+
+    def to_frame(self, limit: int) -> pd.DataFrame:
+        """Последние limit свечей; колонки копируются, чтобы поток не менял данные во время execute()."""
+        n = min(limit, len(self))
+        end = (self._count - 1) % self.capacity + self.capacity + 1
+        window = slice(end - n, end)
+        frame = {"timestamp": self.timestamp[window]}
+        frame.update((col, values[window]) for col, values in self.columns.items())
+        return pd.DataFrame(frame)
+
 class DataFeed:
     def __init__(self, client: CapitalClient):
         self.client = client
         self.logger = logging.getLogger(__name__)
+        # Свечи из потока цен по (symbol, timeframe)
+        # Пока буфера нет (нет подключения к потоку), get_data читает свечи по REST
+        self._streams: Dict[Tuple[str, str], _CandleRing] = {}
+        self._stream_task: Optional[asyncio.Task] = None
+        self._stream_limit = 100
+
+    async def start_stream(self, symbols: List[str], timeframe: str, limit: int = 100) -> None:
+        """Запуск фонового обновления свечей по WebSocket; история догружается по REST при каждом подключении."""
+        self._stream_limit = limit
+        self._stream_task = asyncio.create_task(self._consume_stream(symbols, timeframe))
+
+    async def stop_stream(self) -> None:
+        """Остановка потока цен."""
+        if self._stream_task is not None:
+            self._stream_task.cancel()
+            self._stream_task = None
+        self._streams.clear()
 
     async def get_data(self, symbol: str, timeframe: str, limit: int = 100) -> pd.DataFrame:
+        candles = self._streams.get((symbol, timeframe))
+        if candles:
+            last = candles.last_timestamp()
+            if candles.volumes_refreshed_at != last:
+                candles.volumes_refreshed_at = last
+                candles.volume_refresh = asyncio.create_task(self._refresh_volumes(symbol, timeframe, candles))
+            await asyncio.shield(candles.volume_refresh)
+            return candles.to_frame(limit)
+        return await self._fetch_data(symbol, timeframe, limit)
+
+    async def _load_history(self, symbols: List[str], timeframe: str) -> None:
+        """Заполнение буферов историей по REST: при каждом подключении, чтобы после разрыва не было пропущенных свечей."""
+        for symbol in symbols:
+            history = await self._fetch_data(symbol, timeframe, self._stream_limit)
+            if history.empty:
+                self.logger.warning(f"No history for {symbol} {timeframe}, using REST until next reconnect")
+                continue
+            candles = _CandleRing(self._stream_limit)
+            for row in history.itertuples(index=False, name=None):
+                candles.push(*row)
+            self._streams[(symbol, timeframe)] = candles
+
+    async def _refresh_volumes(self, symbol: str, timeframe: str, candles: _CandleRing) -> None:
+        """Объём последних свечей по REST: поток передаёт только цены, а order block сравнивает объёмы."""
+        recent = await self._fetch_data(symbol, timeframe, _VOLUME_REFRESH_BARS)
+        if recent.empty:
+            # Запрос не удался — повторить при следующем get_data
+            candles.volumes_refreshed_at = None
+        else:
+            candles.set_volumes(recent["timestamp"].to_numpy(dtype="datetime64[ns]"),
+                                recent["volume"].to_numpy(dtype=np.float64))
+
+    async def _consume_stream(self, symbols: List[str], timeframe: str) -> None:
+        """Обновление буферов свечей событиями из потока."""
         try:
-            raw_data = self.client.get_market_data(symbol, timeframe, limit)
+            async for candle in self.client.stream_prices(
+                    symbols, timeframe,
+                    on_connect=lambda: self._load_history(symbols, timeframe),
+                    on_disconnect=self._streams.clear):
+                try:
+                    if candle.get("priceType") != "bid":
+                        continue
+                    candles = self._streams.get((candle["epic"], timeframe))
+                    if candles is None:
+                        continue
+                    timestamp = np.datetime64(candle["t"], "ms")
+                    last = candles.last_timestamp()
+                    if last is not None and last == timestamp:
+                        # Обновление текущей свечи (объём в потоке не передаётся)
+                        candles.update_last(candle["o"], candle["h"], candle["l"], candle["c"])
+                    elif last is None or last < timestamp:
+                        candles.push(timestamp, candle["o"], candle["h"], candle["l"], candle["c"], np.nan)
+                except (KeyError, TypeError, ValueError, AttributeError) as e:
+                    self.logger.warning(f"Skipping malformed candle {candle}: {e}")
+        except Exception as e:
+            self.logger.error(f"Price stream consumer error: {e}")
+        finally:
+            # Поток больше не обновляет свечи — get_data переходит на REST вместо замороженного снимка
+            self._streams.clear()
+
+    async def _fetch_data(self, symbol: str, timeframe: str, limit: int = 100) -> pd.DataFrame:
+        try:
+            raw_data = await self.client.get_market_data(symbol, timeframe, limit)
             if not raw_data:
                 return pd.DataFrame()
 
-            df = pd.DataFrame(raw_data)
-            df["timestamp"] = pd.to_datetime(df["snapshotTimeUTC"])
-            df["close"] = df["closePrice"].apply(lambda x: x.get("bid") if isinstance(x, dict) else None)
-            df["open"] = df["openPrice"].apply(lambda x: x.get("bid") if isinstance(x, dict) else None)
-            df["high"] = df["highPrice"].apply(lambda x: x.get("bid") if isinstance(x, dict) else None)
-            df["low"] = df["lowPrice"].apply(lambda x: x.get("bid") if isinstance(x, dict) else None)
-            df["volume"] = df["lastTradedVolume"]
-
-            return df[["timestamp", "open", "high", "low", "close", "volume"]]
+            # Разбор JSON сразу в колонки NumPy, без промежуточного DataFrame из словарей
+            n = len(raw_data)
+            return pd.DataFrame({
+                "timestamp": pd.to_datetime([r["snapshotTimeUTC"] for r in raw_data]),
+                "open": np.fromiter((_bid(r.get("openPrice")) for r in raw_data), np.float64, n),
+                "high": np.fromiter((_bid(r.get("highPrice")) for r in raw_data), np.float64, n),
+                "low": np.fromiter((_bid(r.get("lowPrice")) for r in raw_data), np.float64, n),
+                "close": np.fromiter((_bid(r.get("closePrice")) for r in raw_data), np.float64, n),
+                "volume": np.fromiter((_volume(r) for r in raw_data), np.float64, n)
+            })
         except Exception as e:
             self.logger.error(f"Failed to fetch data: {e}")
             return pd.DataFrame()
\ No newline at end of file
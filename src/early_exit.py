@@ -1,15 +1,21 @@
 import pandas as pd
+import numpy as np
 import logging
-from typing import Optional
+from collections import deque
+from typing import Dict, Optional, Tuple
 from src.data_feed import DataFeed
 from src.order_manager import OrderManager
 
+_TREND_WINDOW = 20
+
 class EarlyExit:
     def __init__(self, config: dict, data_feed: DataFeed, order_manager: OrderManager):
         self.config = config
         self.data_feed = data_feed
         self.order_manager = order_manager
         self.logger = logging.getLogger(__name__)
+        # Состояние по (symbol, timeframe): последние цены закрытия и время последнего бара
+        self._state: Dict[Tuple[str, str], dict] = {}
 
     async def check_positions(self, symbol: str, timeframe: str) -> None:
         """Проверка позиций на риск смены тренда."""
@@ -23,12 +29,14 @@ class EarlyExit:
                 self.logger.warning("No data for early exit check")
                 return
 
+            closes = self._update_closes(symbol, timeframe, data)
+
             for position in positions:
                 position_id = position["position"]["dealId"]
                 direction = position["position"]["direction"]
 
                 entry_price = position["position"]["level"]
-                last_close = data["close"].iloc[-1]
+                last_close = data["close"].iat[-1]
 
                 min_profit_percent = self.config.get("min_profit_percent", 0.1)
 
@@ -40,18 +48,74 @@ class EarlyExit:
 
                 # Если позиция ещё ни разу не достигла минимального профита — не проверяем EarlyExit
                 if unrealized_profit < min_profit_percent:
-                    self.logger.debug(f"Skipping early exit for {position_id}: unrealized profit {unrealized_profit:.2f}% < threshold {min_profit_percent}%")
+                    self.logger.debug("Skipping early exit for %s: unrealized profit %.2f%% < threshold %s%%",
+                                      position_id, unrealized_profit, min_profit_percent)
                     continue
 
                 # Проверка сигналов смены тренда
-                if self._should_exit(data, direction):
+                if self._should_exit(data, closes, direction):
                     await self.order_manager.close_position(position_id)
-                    self.logger.info(f"Closed position {position_id} due to trend change risk")
+                    self.logger.info("Closed position %s due to trend change risk", position_id)
 
         except Exception as e:
             self.logger.error(f"Error checking positions for early exit: {e}")
 
-    def _should_exit(self, data: pd.DataFrame, direction: str) -> bool:
+    def exit_flags(self, data: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Условия досрочного выхода по всем барам сразу (для бэктеста): (для BUY, для SELL)."""
+        high = data["high"].to_numpy(dtype=np.float64)
+        low = data["low"].to_numpy(dtype=np.float64)
+        close = data["close"].to_numpy(dtype=np.float64)
+        prev_high = np.concatenate(([np.nan], high[:-1]))
+        prev_low = np.concatenate(([np.nan], low[:-1]))
+        prev_close = np.concatenate(([np.nan], close[:-1]))
+
+        # Пробой структуры (BOS)
+        bos_bullish = (high > prev_high) & (close > prev_high)
+        bos_bearish = ~bos_bullish & (low < prev_low) & (close < prev_low)
+
+        # Смена характера (CHOCH)
+        trend = data["close"].rolling(_TREND_WINDOW).mean().to_numpy(dtype=np.float64)
+        prev_trend = np.concatenate(([np.nan], trend[:-1]))
+        choch_bullish = (close > trend) & (prev_close < prev_trend)
+        choch_bearish = ~choch_bullish & (close < trend) & (prev_close > prev_trend)
+
+        # RSI
+        period = self.config["rsi_period"]
+        delta = np.diff(close, prepend=np.nan)
+        gain = pd.Series(np.where(delta > 0, delta, 0.0)).rolling(period).mean().to_numpy()
+        loss = pd.Series(np.where(delta < 0, -delta, 0.0)).rolling(period).mean().to_numpy()
+        loss = np.where(loss == 0, 1e-10, loss)  # избегаем деления на 0
+        rsi = 100 - (100 / (1 + gain / loss))
+
+        exit_buy = bos_bearish | choch_bearish | (rsi > self.config["rsi_overbought"])
+        exit_sell = bos_bullish | choch_bullish | (rsi < self.config["rsi_oversold"])
+        return exit_buy, exit_sell
+
+    def _update_closes(self, symbol: str, timeframe: str, data: pd.DataFrame) -> np.ndarray:
+        """Инкрементальное обновление окна цен закрытия только по новым барам."""
+        state = self._state.get((symbol, timeframe))
+        if state is None:
+            maxlen = max(_TREND_WINDOW, self.config["rsi_period"]) + 1
+            state = {"closes": deque(maxlen=maxlen), "last_ts": None}
+            self._state[(symbol, timeframe)] = state
+
+        closes = state["closes"]
+        last_ts = state["last_ts"]
+        timestamps = data["timestamp"]
+        if last_ts is None or timestamps.iloc[0] > last_ts:
+            # Нет пересечения с сохранённой историей — заполняем окно заново
+            closes.clear()
+            start = max(0, len(data) - closes.maxlen)
+        else:
+            start = int(timestamps.searchsorted(last_ts))
+            if start < len(data) and timestamps.iloc[start] == last_ts:
+                closes.pop()  # последний бар мог обновиться
+        if start < len(data):
+            closes.extend(data["close"].to_numpy(dtype=np.float64)[start:])
+            state["last_ts"] = timestamps.iloc[-1]
+        return np.fromiter(closes, np.float64, len(closes))
+
+    def _should_exit(self, data: pd.DataFrame, closes: np.ndarray, direction: str) -> bool:
         """Проверка условий для досрочного закрытия."""
         # Пробой структуры (BOS)
         bos = self._detect_break_of_structure(data)
@@ -60,13 +124,13 @@ class EarlyExit:
             return True
 
         # Смена характера (CHOCH)
-        choch = self._detect_change_of_character(data)
+        choch = self._detect_change_of_character(closes)
         if choch and ((direction == "BUY" and choch["type"] == "bearish") or
                       (direction == "SELL" and choch["type"] == "bullish")):
             return True
 
         # RSI для перекупленности/перепроданности
-        rsi = self._calculate_rsi(data)
+        rsi = self._calculate_rsi(closes)
         if rsi is not None:
             if direction == "BUY" and rsi > self.config["rsi_overbought"]:
                 return True
@@ -76,35 +140,40 @@ class EarlyExit:
         return False
 
     def _detect_break_of_structure(self, data: pd.DataFrame) -> Optional[dict]:
-        data["higher_high"] = data["high"] > data["high"].shift(1)
-        data["lower_low"] = data["low"] < data["low"].shift(1)
-        last_candle = data.iloc[-1]
-        if last_candle["higher_high"] and data["close"].iloc[-1] > data["high"].iloc[-2]:
-            return {"price": last_candle["close"], "type": "bullish"}
-        elif last_candle["lower_low"] and data["close"].iloc[-1] < data["low"].iloc[-2]:
-            return {"price": last_candle["close"], "type": "bearish"}
+        high = data["high"]
+        low = data["low"]
+        last_close = data["close"].iat[-1]
+        if high.iat[-1] > high.iat[-2] and last_close > high.iat[-2]:
+            return {"price": last_close, "type": "bullish"}
+        elif low.iat[-1] < low.iat[-2] and last_close < low.iat[-2]:
+            return {"price": last_close, "type": "bearish"}
         return None
 
-    def _detect_change_of_character(self, data: pd.DataFrame) -> Optional[dict]:
-        data["trend"] = data["close"].rolling(20).mean()
-        last_candle = data.iloc[-1]
-        if last_candle["close"] > data["trend"].iloc[-1] and data["close"].iloc[-2] < data["trend"].iloc[-2]:
-            return {"price": last_candle["close"], "type": "bullish"}
-        elif last_candle["close"] < data["trend"].iloc[-1] and data["close"].iloc[-2] > data["trend"].iloc[-2]:
-            return {"price": last_candle["close"], "type": "bearish"}
+    def _detect_change_of_character(self, closes: np.ndarray) -> Optional[dict]:
+        if len(closes) < _TREND_WINDOW + 1:
+            return None
+        trend_last = closes[-_TREND_WINDOW:].mean()
+        trend_prev = closes[-_TREND_WINDOW - 1:-1].mean()
+        if closes[-1] > trend_last and closes[-2] < trend_prev:
+            return {"price": closes[-1], "type": "bullish"}
+        elif closes[-1] < trend_last and closes[-2] > trend_prev:
+            return {"price": closes[-1], "type": "bearish"}
         return None
 
-    def _calculate_rsi(self, data: pd.DataFrame) -> Optional[float]:
-        """Рассчёт RSI."""
+    def _calculate_rsi(self, closes: np.ndarray) -> Optional[float]:
+        """Рассчёт RSI по последним rsi_period изменениям цены."""
         try:
-            delta = data["close"].diff()
-            gain = delta.where(delta > 0, 0).rolling(self.config["rsi_period"]).mean()
-            loss = -delta.where(delta < 0, 0).rolling(self.config["rsi_period"]).mean()
-            loss = loss.replace(0, 1e-10)  # избегаем деления на 0
+            period = self.config["rsi_period"]
+            if len(closes) < period + 1:
+                return None
+            delta = np.diff(closes[-period - 1:])
+            gain = delta[delta > 0].sum() / period
+            loss = -delta[delta < 0].sum() / period
+            if loss == 0:
+                loss = 1e-10  # избегаем деления на 0
 
             rs = gain / loss
-            rsi = 100 - (100 / (1 + rs))
-            return rsi.iloc[-1]
+            return 100 - (100 / (1 + rs))
         except Exception as e:
             self.logger.error(f"Error calculating RSI: {e}")
             return None
\ No newline at end of file
@@ -7,17 +7,19 @@ class OrderManager:
     def __init__(self, client: CapitalClient):
         self.client = client
         self.config = load_config("config.yaml")
+        self._is_backtest = self.config["mode"] == "backtest"
         self.logger = logging.getLogger(__name__)
 
     async def place_order(self, symbol: str, direction: str, size: float, price: Optional[float] = None,
                           stop_loss: Optional[float] = None, take_profit: Optional[float] = None) -> None:
         try:
-            if self.config["mode"] == "backtest":
-                self.logger.info(f"Simulated order: {symbol}, {direction}, size={size}, price={price}, SL={stop_loss}, TP={take_profit}")
+            if self._is_backtest:
+                self.logger.info("Simulated order: %s, %s, size=%s, price=%s, SL=%s, TP=%s",
+                                 symbol, direction, size, price, stop_loss, take_profit)
                 return
-            result = self.client.place_order(symbol, direction, size, price, stop_loss, take_profit)
+            result = await self.client.place_order(symbol, direction, size, price, stop_loss, take_profit)
             if result:
-                self.logger.info(f"Order placed successfully: {result}")
+                self.logger.info("Order placed successfully: %s", result)
             else:
                 self.logger.warning("Order placement failed")
         except Exception as e:
@@ -26,13 +28,10 @@ class OrderManager:
     async def close_position(self, position_id: str) -> None:
         """Закрытие позиции по ID."""
         try:
-            if self.config["mode"] == "backtest":
+            if self._is_backtest:
                 self.logger.info(f"Simulated position close: {position_id}")
                 return
-            response = self.client.session.delete(
-                f"{self.client.base_url}/positions/{position_id}"
-            )
-            response.raise_for_status()
+            await self.client.delete_position(position_id)
             self.logger.info(f"Position {position_id} closed successfully")
         except Exception as e:
             self.logger.error(f"Error closing position {position_id}: {e}")
@@ -40,13 +39,13 @@ class OrderManager:
     async def get_open_positions(self, symbol: str) -> List:
         """Получение списка открытых позиций."""
         try:
-            if self.config["mode"] == "backtest":
+            if self._is_backtest:
                 return []  # В бэктесте позиции обрабатываются Backtester
-            response = self.client.session.get(f"{self.client.base_url}/positions")
-            response.raise_for_status()
-            positions = response.json().get("positions", [])
+            # API не фильтрует позиции по epic — фильтрация на клиенте
+            positions = await self.client.get_positions()
             filtered_positions = [p for p in positions if p["market"]["epic"] == symbol]
-            self.logger.debug(f"Fetched positions: {filtered_positions}")
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"Fetched positions: {filtered_positions}")
             return filtered_positions
         except Exception as e:
             self.logger.error(f"Error fetching positions: {str(e)}")
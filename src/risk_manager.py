@@ -8,19 +8,17 @@ class RiskManager:
         self.logger = logging.getLogger(__name__)
 
     def calculate_position_size(self, entry_price: float, stop_loss: float) -> float:
-        """Расчёт размера позиции на основе риска."""
-        try:
-            risk_amount = self.intitial_balance * self.max_risk_per_trade
-            risk_per_unit = abs(entry_price - stop_loss)
-            if risk_per_unit == 0:
-                self.logger.warning("Invalid stop loss, setting size to 0")
-                return 0.0
-            size = risk_amount / risk_per_unit
-            self.logger.info(f"Calculated position size: {size} for risk {risk_amount}")
-            return round(size, 2)
-        except Exception as e:
-            self.logger.error(f"Error calculating position size: {e}")
+        """Расчёт размера позиции на основе риска (усечение до 0.01)."""
+        risk_amount = self.intitial_balance * self.max_risk_per_trade
+        risk_per_unit = entry_price - stop_loss
+        if risk_per_unit < 0.0:
+            risk_per_unit = -risk_per_unit
+        if not risk_per_unit > 0.0:  # ноль или NaN (нет данных для SL)
+            self.logger.warning("Invalid stop loss, setting size to 0")
             return 0.0
+        size = int(risk_amount / risk_per_unit * 100) / 100
+        self.logger.info("Calculated position size: %s for risk %s", size, risk_amount)
+        return size
 
     def update_balance(self, new_balance: float) -> None:
         """Обновление баланса."""
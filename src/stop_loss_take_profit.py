@@ -1,37 +1,83 @@
 import pandas as pd
+import numpy as np
 import logging
-from typing import Tuple, Optional
+from numba import njit
+from typing import Dict, Tuple, Optional
+
+@njit(cache=True)
+def _atr_nb(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int) -> float:
+    """Среднее True Range за последние period баров (NaN, если баров меньше)."""
+    n = high.shape[0]
+    if n < period:
+        return np.nan
+    acc = 0.0
+    for i in range(n - period, n):
+        if i == 0:
+            tr = high[i] - low[i]  # у первого бара нет предыдущего закрытия
+        else:
+            # max(H-L, |H-Cprev|, |L-Cprev|) == max(H, Cprev) - min(L, Cprev)
+            tr = max(high[i], close[i - 1]) - min(low[i], close[i - 1])
+        acc += tr
+    return acc / period
+
+@njit(cache=True)
+def _support_resistance_nb(high: np.ndarray, low: np.ndarray, window: int) -> Tuple[float, float]:
+    """Минимум low и максимум high за последние window баров одним проходом."""
+    n = high.shape[0]
+    if n < window:
+        return np.nan, np.nan
+    support = low[n - window]
+    resistance = high[n - window]
+    for i in range(n - window + 1, n):
+        if low[i] < support:
+            support = low[i]
+        if high[i] > resistance:
+            resistance = high[i]
+    return support, resistance
+
+# Прогрев JIT при импорте, чтобы первый расчёт SL/TP не ждал компиляции
+_atr_nb(np.ones(2), np.ones(2), np.ones(2), 2)
+_support_resistance_nb(np.ones(2), np.ones(2), 2)
 
 class StopLossTakeProfit:
     def __init__(self, config: dict):
         self.config = config
+        # Параметры читаются один раз, а не на каждый расчёт
+        self._atr_sl = float(config["atr_multiplier_sl"])
+        self._atr_tp = float(config["atr_multiplier_tp"])
+        self._rr = float(config["rr_ratio"])
+        self._atr_period = int(config["atr_period"])
+        self._sr_window = int(config["sr_window"])
         self.logger = logging.getLogger(__name__)
 
-    def calculate_sl_tp(self, data: pd.DataFrame, entry_price: float, direction: str) -> Tuple[float, float]:
-        """Расчёт оптимальных SL и TP."""
-        try:
-            # Рассчёт ATR
-            atr = self._calculate_atr(data)
-            atr_multiplier_sl = self.config["atr_multiplier_sl"]
-            atr_multiplier_tp = self.config["atr_multiplier_tp"]
+    def calc_context(self, data: pd.DataFrame) -> Dict[str, float]:
+        """ATR и уровни поддержки/сопротивления — один раз на бар для всех сигналов."""
+        support, resistance = self._find_support_resistance(data)
+        return {"atr": self._calculate_atr(data), "support": support, "resistance": resistance}
 
-            # Определение уровней поддержки/сопротивления
-            support, resistance = self._find_support_resistance(data)
+    def calculate_sl_tp(self, ctx: Dict[str, float], entry_price: float, direction: str) -> Tuple[float, float]:
+        """Расчёт оптимальных SL и TP по контексту из calc_context."""
+        try:
+            atr = ctx["atr"]
+            atr_multiplier_sl = self._atr_sl
+            atr_multiplier_tp = self._atr_tp
+            support = ctx["support"]
+            resistance = ctx["resistance"]
 
             # Базовый SL и TP на основе ATR
             if direction.upper() == "BUY":
                 sl = entry_price - atr * atr_multiplier_sl
-                tp = entry_price + atr * atr_multiplier_tp * self.config["rr_ratio"]
+                tp = entry_price + atr * atr_multiplier_tp * self._rr
                 # Корректировка SL/TP с учётом уровней
                 sl = max(sl, support * 0.995) if support else sl
                 tp = min(tp, resistance * 1.005) if resistance else tp
             else:  # SELL
                 sl = entry_price + atr * atr_multiplier_sl
-                tp = entry_price - atr * atr_multiplier_tp * self.config["rr_ratio"]
+                tp = entry_price - atr * atr_multiplier_tp * self._rr
                 sl = min(sl, resistance * 1.005) if resistance else sl
                 tp = max(tp, support * 0.995) if support else tp
 
-            self.logger.info(f"Calculated SL: {sl}, TP: {tp} for entry {entry_price}")
+            self.logger.info("Calculated SL: %s, TP: %s for entry %s", sl, tp, entry_price)
             return round(sl, 5), round(tp, 5)
 
         except Exception as e:
@@ -40,22 +86,17 @@ class StopLossTakeProfit:
 
     def _calculate_atr(self, data: pd.DataFrame) -> float:
         """Рассчёт ATR (Average True Range)."""
-        # Создаём копию DataFrame, чтобы избежать SettingWithCopyWarning
-        df = data.copy()
-        
-        # Рассчёт True Range
-        df["high_low"] = df["high"] - df["low"]
-        df["high_close"] = abs(df["high"] - df["close"].shift(1))
-        df["low_close"] = abs(df["low"] - df["close"].shift(1))
-        df["tr"] = df[["high_low", "high_close", "low_close"]].max(axis=1)
-        
-        # Рассчёт среднего TR
-        atr = df["tr"].rolling(self.config["atr_period"]).mean().iloc[-1]
-        return atr
+        return _atr_nb(
+            data["high"].to_numpy(dtype=np.float64),
+            data["low"].to_numpy(dtype=np.float64),
+            data["close"].to_numpy(dtype=np.float64),
+            self._atr_period
+        )
 
     def _find_support_resistance(self, data: pd.DataFrame) -> Tuple[Optional[float], Optional[float]]:
         """Поиск уровней поддержки и сопротивления."""
-        window = self.config["sr_window"]
-        support = data["low"].rolling(window).min().iloc[-1]
-        resistance = data["high"].rolling(window).max().iloc[-1]
-        return support, resistance
\ No newline at end of file
+        return _support_resistance_nb(
+            data["high"].to_numpy(dtype=np.float64),
+            data["low"].to_numpy(dtype=np.float64),
+            self._sr_window
+        )
\ No newline at end of file
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+from enum import IntEnum
+from types import SimpleNamespace
+from typing import Dict
+
+class Bias(IntEnum):
+    """Направление сигнала/дня; члены — синглтоны, сравнение через is."""
+    BULL = 1
+    BEAR = -1
+    NEUTRAL = 0
+
+def as_soa(df: pd.DataFrame) -> SimpleNamespace:
+    """Колонки OHLCV как массивы float64 (o, h, l, c, v) — один раз на вызов execute()."""
+    return SimpleNamespace(
+        o=df["open"].to_numpy(dtype=np.float64),
+        h=df["high"].to_numpy(dtype=np.float64),
+        l=df["low"].to_numpy(dtype=np.float64),
+        c=df["close"].to_numpy(dtype=np.float64),
+        v=df["volume"].to_numpy(dtype=np.float64) if "volume" in df else None
+    )
+
+class BaseStrategy:
+    """Общая логика стратегий; атрибуты symbol, sl_tp_calculator, risk_manager, order_manager задаёт наследник."""
+
+    async def _submit(self, signal: Dict, ctx: Dict[str, float]) -> None:
+        """SL/TP, размер позиции и ордер по сигналу; сделки нулевого размера пропускаются."""
+        price = signal["price"]
+        direction = "BUY" if signal["type"] is Bias.BULL else "SELL"
+        sl, tp = self.sl_tp_calculator.calculate_sl_tp(ctx, price, direction)
+        size = self.risk_manager.calculate_position_size(price, sl)
+
+        if size == 0.0:
+            return
+
+        await self.order_manager.place_order(self.symbol, direction, size, price, sl, tp)
\ No newline at end of file
@@ -1,16 +1,23 @@
-import pandas as pd
 import logging
-from typing import Optional, Dict
+from typing import Optional, Dict, Tuple
 from src.data_feed import DataFeed
 from src.order_manager import OrderManager
 from src.risk_manager import RiskManager
 from src.stop_loss_take_profit import StopLossTakeProfit
 from src.early_exit import EarlyExit
 from src.config import load_config
-from datetime import datetime, time
+from src.strategies.base import BaseStrategy, Bias, as_soa
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
 import asyncio
 
-class ICTStrategy:
+class ICTStrategy(BaseStrategy):
+    # Kill zones в секундах от полуночи UTC: (сессия, начало, конец)
+    _SESSIONS = (("london", 8 * 3600, 11 * 3600), ("new_york", 13 * 3600, 16 * 3600))
+    # Как часто перепроверять дневную свечу, если новая не открылась в срок (выходные, праздники)
+    _DAILY_RECHECK = timedelta(minutes=15)
+
     def __init__(self, symbol: str, timeframe: str, data_feed: DataFeed, order_manager: OrderManager,
                  risk_manager: RiskManager, sl_tp_calculator: StopLossTakeProfit, early_exit: EarlyExit,
                  config: Dict):
@@ -23,6 +30,10 @@ class ICTStrategy:
         self.early_exit = early_exit
         self.config = config
         self.global_config = load_config("config.yaml")
+        self._is_backtest = self.global_config["mode"] == "backtest"
+        self._kill_zones = config.get("kill_zones", {})
+        self._daily_candle: Optional[Tuple[datetime, float]] = None  # (время открытия, open) текущей дневной свечи
+        self._daily_checked_at: Optional[datetime] = None  # время последнего запроса дневных свечей
         self.logger = logging.getLogger(__name__)
 
     async def execute(self) -> None:
@@ -32,114 +43,103 @@ class ICTStrategy:
 
         try:
             # Получение данных в зависимости от режима
-            if self.global_config["mode"] == "backtest":
+            if self._is_backtest:
                 data = self.data_feed.get_data(self.symbol, self.timeframe)
+                daily_open = None
             else:
-                data = await self.data_feed.get_data(self.symbol, self.timeframe)
+                # Свечи таймфрейма и открытие дня запрашиваются параллельно
+                data, daily_open = await asyncio.gather(
+                    self.data_feed.get_data(self.symbol, self.timeframe),
+                    self._get_daily_open()
+                )
                 
             if data.empty:
                 self.logger.warning("No data received")
                 return
 
-            daily_bias = await self._get_daily_bias()
-            ms_break = self._detect_market_structure_break(data)
-            judas_swing = self._detect_judas_swing(data)
-            ote = self._detect_optimal_trade_entry(data)
-
-            if ms_break and daily_bias == ms_break["type"]:
-                await self._trade_market_structure(ms_break, data)
-            if judas_swing and daily_bias == judas_swing["type"]:
-                await self._trade_judas_swing(judas_swing, data)
-            if ote and daily_bias == ote["type"]:
-                await self._trade_optimal_trade_entry(ote, data)
+            arr = as_soa(data)
+            daily_bias = self._get_daily_bias(arr.c[-1], daily_open)
+            ms_break = self._detect_market_structure_break(arr)
+            judas_swing = self._detect_judas_swing(arr)
+            ote = self._detect_optimal_trade_entry(arr)
+            if not (ms_break or judas_swing or ote):
+                return
+            ctx = self.sl_tp_calculator.calc_context(data)  # общий для всех сигналов бара
+
+            # Ордера по независимым сигналам отправляются параллельно
+            trades = []
+            if ms_break and daily_bias is ms_break["type"]:
+                trades.append(self._submit(ms_break, ctx))
+            if judas_swing and daily_bias is judas_swing["type"]:
+                trades.append(self._submit(judas_swing, ctx))
+            if ote and daily_bias is ote["type"]:
+                trades.append(self._submit(ote, ctx))
+            for result in await asyncio.gather(*trades, return_exceptions=True):
+                if isinstance(result, Exception):
+                    self.logger.error(f"ICT strategy error: {result}")
 
         except Exception as e:
             self.logger.error(f"ICT strategy error: {e}")
 
     def _is_kill_zone(self) -> bool:
-        now = datetime.utcnow().time()
-        sessions = {
-            "london": (time(8, 0), time(11, 0)),
-            "new_york": (time(13, 0), time(16, 0))
-        }
-        for session, (start, end) in sessions.items():
-            if start <= now <= end and self.config["kill_zones"][session]:
+        now = time.gmtime()
+        seconds = now.tm_hour * 3600 + now.tm_min * 60 + now.tm_sec
+        for session, start, end in self._SESSIONS:
+            if start <= seconds <= end and self._kill_zones.get(session):
                 return True
         return False
 
-    async def _get_daily_bias(self) -> str:
-        if self.global_config["mode"] == "backtest":
+    def _get_daily_bias(self, last_close: float, daily_open: Optional[float]) -> Bias:
+        if self._is_backtest:
             daily_data = self.data_feed.get_data(self.symbol, "DAY", 10)
-        else:
+            if daily_data.empty:
+                return Bias.NEUTRAL
+            return Bias.BULL if daily_data["close"].iloc[-1] > daily_data["open"].iloc[-1] else Bias.BEAR
+
+        # Live: закрытие текущей дневной свечи — это последняя цена таймфрейма стратегии
+        if daily_open is None:
+            return Bias.NEUTRAL
+        return Bias.BULL if last_close > daily_open else Bias.BEAR
+
+    async def _get_daily_open(self) -> Optional[float]:
+        """Открытие последней дневной свечи; запрос повторяется, когда по времени должна начаться следующая, но не чаще _DAILY_RECHECK."""
+        # Дневные свечи брокера начинаются не в полночь UTC, поэтому ориентир — время открытия самой свечи
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        if self._daily_candle is None or (now >= self._daily_candle[0] + timedelta(days=1)
+                                          and now >= self._daily_checked_at + self._DAILY_RECHECK):
+            self._daily_checked_at = now
             daily_data = await self.data_feed.get_data(self.symbol, "DAY", 10)
-            
-        if daily_data.empty:
-            return "neutral"
-        return "bullish" if daily_data["close"].iloc[-1] > daily_data["open"].iloc[-1] else "bearish"
-
-    def _detect_market_structure_break(self, data: pd.DataFrame) -> Optional[Dict]:
-        # Создаём копию DataFrame, чтобы избежать SettingWithCopyWarning
-        df = data.copy()
-        
-        # Рассчёт индикаторов
-        df["higher_high"] = df["high"] > df["high"].shift(1)
-        df["lower_low"] = df["low"] < df["low"].shift(1)
-        last_candle = df.iloc[-1]
-        
-        if last_candle["higher_high"] and df["close"].iloc[-1] > df["high"].iloc[-2]:
-            return {"price": last_candle["close"], "type": "bullish"}
-        elif last_candle["lower_low"] and df["close"].iloc[-1] < df["low"].iloc[-2]:
-            return {"price": last_candle["close"], "type": "bearish"}
+            if daily_data.empty:
+                return None if self._daily_candle is None else self._daily_candle[1]
+            self._daily_candle = (daily_data["timestamp"].iloc[-1], daily_data["open"].iloc[-1])
+        return self._daily_candle[1]
+
+    def _detect_market_structure_break(self, arr: SimpleNamespace) -> Optional[Dict]:
+        # Только последние две свечи — без копии DataFrame и вспомогательных колонок
+        if arr.h[-1] > arr.h[-2] and arr.c[-1] > arr.h[-2]:
+            return {"price": arr.c[-1], "type": Bias.BULL}
+        elif arr.l[-1] < arr.l[-2] and arr.c[-1] < arr.l[-2]:
+            return {"price": arr.c[-1], "type": Bias.BEAR}
         return None
 
-    def _detect_judas_swing(self, data: pd.DataFrame) -> Optional[Dict]:
-        recent_high = data["high"].iloc[-10:].max()
-        recent_low = data["low"].iloc[-10:].min()
-        last_candle = data.iloc[-1]
-        if last_candle["high"] > recent_high and last_candle["close"] < recent_high:
-            return {"price": last_candle["close"], "type": "bearish"}
-        elif last_candle["low"] < recent_low and last_candle["close"] > recent_low:
-            return {"price": last_candle["close"], "type": "bullish"}
+    def _detect_judas_swing(self, arr: SimpleNamespace) -> Optional[Dict]:
+        recent_high = arr.h[-10:].max()
+        recent_low = arr.l[-10:].min()
+        last_close = arr.c[-1]
+        if arr.h[-1] > recent_high and last_close < recent_high:
+            return {"price": last_close, "type": Bias.BEAR}
+        elif arr.l[-1] < recent_low and last_close > recent_low:
+            return {"price": last_close, "type": Bias.BULL}
         return None
 
-    def _detect_optimal_trade_entry(self, data: pd.DataFrame) -> Optional[Dict]:
-        swing_high = data["high"].iloc[-20:].max()
-        swing_low = data["low"].iloc[-20:].min()
+    def _detect_optimal_trade_entry(self, arr: SimpleNamespace) -> Optional[Dict]:
+        swing_high = arr.h[-20:].max()
+        swing_low = arr.l[-20:].min()
         fib_618 = swing_low + (swing_high - swing_low) * 0.618
         fib_786 = swing_low + (swing_high - swing_low) * 0.786
-        last_candle = data.iloc[-1]
-        if fib_618 <= last_candle["close"] <= fib_786:
-            return {"price": last_candle["close"], "type": "bullish"}
-        elif swing_high - (swing_high - swing_low) * 0.786 <= last_candle["close"] <= swing_high - (swing_high - swing_low) * 0.618:
-            return {"price": last_candle["close"], "type": "bearish"}
-        return None
-
-    async def _trade_market_structure(self, ms_break: Dict, data: pd.DataFrame) -> None:
-        direction = "BUY" if ms_break["type"] == "bullish" else "SELL"
-        sl, tp = self.sl_tp_calculator.calculate_sl_tp(data, ms_break["price"], direction)
-        size = self.risk_manager.calculate_position_size(ms_break["price"], sl)
-
-        if size == 0.0:
-            return
-
-        await self.order_manager.place_order(self.symbol, direction, size, ms_break["price"], sl, tp)
-
-    async def _trade_judas_swing(self, judas: Dict, data: pd.DataFrame) -> None:
-        direction = "BUY" if judas["type"] == "bullish" else "SELL"
-        sl, tp = self.sl_tp_calculator.calculate_sl_tp(data, judas["price"], direction)
-        size = self.risk_manager.calculate_position_size(judas["price"], sl)
-
-        if size == 0.0:
-            return
-
-        await self.order_manager.place_order(self.symbol, direction, size, judas["price"], sl, tp)
-
-    async def _trade_optimal_trade_entry(self, ote: Dict, data: pd.DataFrame) -> None:
-        direction = "BUY" if ote["type"] == "bullish" else "SELL"
-        sl, tp = self.sl_tp_calculator.calculate_sl_tp(data, ote["price"], direction)
-        size = self.risk_manager.calculate_position_size(ote["price"], sl)
-
-        if size == 0.0:
-            return
-
-        await self.order_manager.place_order(self.symbol, direction, size, ote["price"], sl, tp)
\ No newline at end of file
+        last_close = arr.c[-1]
+        if fib_618 <= last_close <= fib_786:
+            return {"price": last_close, "type": Bias.BULL}
+        elif swing_high - (swing_high - swing_low) * 0.786 <= last_close <= swing_high - (swing_high - swing_low) * 0.618:
+            return {"price": last_close, "type": Bias.BEAR}
+        return None
\ No newline at end of file
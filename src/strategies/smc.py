@@ -1,14 +1,105 @@
-import pandas as pd
+import asyncio
+import numpy as np
 import logging
-from typing import Optional, Dict, List
+from numba import njit
+from typing import Optional, Dict, Tuple
 from src.data_feed import DataFeed
 from src.order_manager import OrderManager
 from src.risk_manager import RiskManager
 from src.stop_loss_take_profit import StopLossTakeProfit
 from src.early_exit import EarlyExit
 from src.config import load_config
+from src.strategies.base import BaseStrategy, Bias, as_soa
+
+_TREND_WINDOW = 20
+_LIQUIDITY_WINDOW = 10
+# Порядок сигналов в результатах _smc_scan
+_OB, _FVG, _LIQUIDITY, _BOS, _CHOCH = range(5)
+
+@njit(cache=True)
+def _smc_scan(o: np.ndarray, h: np.ndarray, l: np.ndarray, c: np.ndarray, v: np.ndarray,
+              ob_volume_multiplier: float, trend_window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Все детекторы SMC за один вызов: тип сигнала (1 — bullish, -1 — bearish, 0 — нет) и цена."""
+    types = np.zeros(5, dtype=np.int8)
+    prices = np.zeros(5)
+    n = c.shape[0]
+    if n < 2:
+        return types, prices
+    last_bullish = c[-1] > o[-1]
+
+    # Средние объёма (без NaN свечей из потока) и диапазона — за один проход
+    volume_sum = 0.0
+    volume_count = 0
+    range_sum = 0.0
+    for i in range(n):
+        range_sum += h[i] - l[i]
+        if not np.isnan(v[i]):
+            volume_sum += v[i]
+            volume_count += 1
+    volume_mean = volume_sum / volume_count if volume_count > 0 else np.nan
+
+    # Order block: объём и диапазон последней свечи выше средних, смена направления свечей
+    if (v[-1] > volume_mean * ob_volume_multiplier and
+            h[-1] - l[-1] > range_sum / n and
+            (c[-2] > o[-2]) != last_bullish):
+        types[_OB] = 1 if last_bullish else -1
+        prices[_OB] = c[-1]
+
+    # Fair value gap: самый свежий разрыв между свечами i и i+2 (поиск с конца)
+    for i in range(n - 3, -1, -1):
+        if h[i] < l[i + 2] and c[i + 1] > o[i + 1]:
+            types[_FVG] = 1
+            prices[_FVG] = (h[i] + l[i + 2]) / 2
+            break
+        elif l[i] > h[i + 2] and c[i + 1] < o[i + 1]:
+            types[_FVG] = -1
+            prices[_FVG] = (l[i] + h[i + 2]) / 2
+            break
+
+    # Liquidity grab
+    recent_high = h[-_LIQUIDITY_WINDOW:].max()
+    recent_low = l[-_LIQUIDITY_WINDOW:].min()
+    if h[-1] > recent_high:
+        types[_LIQUIDITY] = -1
+        prices[_LIQUIDITY] = recent_high
+    elif l[-1] < recent_low:
+        types[_LIQUIDITY] = 1
+        prices[_LIQUIDITY] = recent_low
+
+    # Break of structure
+    if h[-1] > h[-2] and c[-1] > h[-2]:
+        types[_BOS] = 1
+        prices[_BOS] = c[-1]
+    elif l[-1] < l[-2] and c[-1] < l[-2]:
+        types[_BOS] = -1
+        prices[_BOS] = c[-1]
+
+    # Change of character: пересечение скользящей средней за trend_window баров
+    if n > trend_window:
+        # Одна сумма окна предыдущего бара; среднее последнего бара — сдвигом окна на одну свечу
+        acc = 0.0
+        for i in range(n - trend_window - 1, n - 1):
+            acc += c[i]
+        trend_prev = acc / trend_window
+        trend_last = trend_prev + (c[-1] - c[n - trend_window - 1]) / trend_window
+        if c[-1] > trend_last and c[-2] < trend_prev:
+            types[_CHOCH] = 1
+            prices[_CHOCH] = c[-1]
+        elif c[-1] < trend_last and c[-2] > trend_prev:
+            types[_CHOCH] = -1
+            prices[_CHOCH] = c[-1]
+    return types, prices
+
+# Прогрев JIT при импорте
+_smc_scan(np.ones(3), np.ones(3), np.ones(3), np.ones(3), np.ones(3), 1.0, _TREND_WINDOW)
+
+def _decode_signal(types: np.ndarray, prices: np.ndarray, idx: int) -> Optional[Dict]:
+    """Сигнал из результатов _smc_scan в прежнем формате словаря."""
+    if types[idx] == 0:
+        return None
+    return {"price": prices[idx], "type": Bias.BULL if types[idx] > 0 else Bias.BEAR}
 
-class SMCStrategy:
+class SMCStrategy(BaseStrategy):
     def __init__(self, symbol: str, timeframe: str, data_feed: DataFeed, order_manager: OrderManager,
                  risk_manager: RiskManager, sl_tp_calculator: StopLossTakeProfit, early_exit: EarlyExit,
                  config: Dict):
@@ -21,12 +112,14 @@ class SMCStrategy:
         self.early_exit = early_exit
         self.config = config
         self.global_config = load_config("config.yaml")
+        self._is_backtest = self.global_config["mode"] == "backtest"
+        self._ob_volume_multiplier = float(config["ob_volume_multiplier"])
         self.logger = logging.getLogger(__name__)
 
     async def execute(self) -> None:
         try:
             # Получение данных в зависимости от режима
-            if self.global_config["mode"] == "backtest":
+            if self._is_backtest:
                 data = self.data_feed.get_data(self.symbol, self.timeframe)
             else:
                 data = await self.data_feed.get_data(self.symbol, self.timeframe)
@@ -35,131 +128,36 @@ class SMCStrategy:
                 self.logger.warning("No data received")
                 return
 
-            order_block = self._detect_order_block(data)
-            fvg = self._detect_fair_value_gap(data)
-            liquidity = self._detect_liquidity_grab(data)
-            bos = self._detect_break_of_structure(data)
-            choch = self._detect_change_of_character(data)
-
+            arr = as_soa(data)
+            types, prices = _smc_scan(arr.o, arr.h, arr.l, arr.c, arr.v,
+                                      self._ob_volume_multiplier, _TREND_WINDOW)
+            if not types.any():
+                return
+            ctx = self.sl_tp_calculator.calc_context(data)  # общий для всех сигналов бара
+            order_block = _decode_signal(types, prices, _OB)
+            if order_block:
+                order_block["high"] = arr.h[-1]
+                order_block["low"] = arr.l[-1]
+            fvg = _decode_signal(types, prices, _FVG)
+            liquidity = _decode_signal(types, prices, _LIQUIDITY)
+            bos = _decode_signal(types, prices, _BOS)
+            choch = _decode_signal(types, prices, _CHOCH)
+
+            # Ордера по независимым сигналам отправляются параллельно
+            trades = []
             if order_block:
-                await self._trade_order_block(order_block, data)
+                trades.append(self._submit(order_block, ctx))
             if fvg:
-                await self._trade_fair_value_gap(fvg, data)
+                trades.append(self._submit(fvg, ctx))
             if liquidity:
-                await self._trade_liquidity_grab(liquidity, data)
+                trades.append(self._submit(liquidity, ctx))
             if bos:
-                await self._trade_break_of_structure(bos, data)
+                trades.append(self._submit(bos, ctx))
             if choch:
-                await self._trade_change_of_character(choch, data)
+                trades.append(self._submit(choch, ctx))
+            for result in await asyncio.gather(*trades, return_exceptions=True):
+                if isinstance(result, Exception):
+                    self.logger.error(f"SMC strategy error: {result}")
 
         except Exception as e:
-            self.logger.error(f"SMC strategy error: {e}")
-
-    def _detect_order_block(self, data: pd.DataFrame) -> Optional[Dict]:
-        data = data.copy()
-        data["range"] = data["high"] - data["low"]
-        data["is_bullish"] = data["close"] > data["open"]
-        last_candle = data.iloc[-1]
-        prev_candle = data.iloc[-2]
-        if (last_candle["volume"] > data["volume"].mean() * self.config["ob_volume_multiplier"] and
-                last_candle["range"] > data["range"].mean() and
-                prev_candle["is_bullish"] != last_candle["is_bullish"]):
-            return {
-                "price": last_candle["close"],
-                "type": "bullish" if last_candle["is_bullish"] else "bearish",
-                "high": last_candle["high"],
-                "low": last_candle["low"]
-            }
-        return None
-
-    def _detect_fair_value_gap(self, data: pd.DataFrame) -> Optional[Dict]:
-        for i in range(len(data) - 2):
-            c1 = data.iloc[i]
-            c2 = data.iloc[i+1]
-            c3 = data.iloc[i+2]
-            if c1["high"] < c3["low"] and c2["close"] > c2["open"]:
-                return {"price": (c1["high"] + c3["low"]) / 2, "type": "bullish"}
-            elif c1["low"] > c3["high"] and c2["close"] < c2["open"]:
-                return {"price": (c1["low"] + c3["high"]) / 2, "type": "bearish"}
-        return None
-
-    def _detect_liquidity_grab(self, data: pd.DataFrame) -> Optional[Dict]:
-        recent_high = data["high"].iloc[-10:].max()
-        recent_low = data["low"].iloc[-10:].min()
-        last_candle = data.iloc[-1]
-        if last_candle["high"] > recent_high:
-            return {"price": recent_high, "type": "bearish"}
-        elif last_candle["low"] < recent_low:
-            return {"price": recent_low, "type": "bullish"}
-        return None
-
-    def _detect_break_of_structure(self, data: pd.DataFrame) -> Optional[Dict]:
-        data = data.copy()
-        data["higher_high"] = data["high"] > data["high"].shift(1)
-        data["lower_low"] = data["low"] < data["low"].shift(1)
-        last_candle = data.iloc[-1]
-        if last_candle["higher_high"] and data["close"].iloc[-1] > data["high"].iloc[-2]:
-            return {"price": last_candle["close"], "type": "bullish"}
-        elif last_candle["lower_low"] and data["close"].iloc[-1] < data["low"].iloc[-2]:
-            return {"price": last_candle["close"], "type": "bearish"}
-        return None
-
-    def _detect_change_of_character(self, data: pd.DataFrame) -> Optional[Dict]:
-        data = data.copy()
-        data["trend"] = data["close"].rolling(20).mean()
-        last_candle = data.iloc[-1]
-        if last_candle["close"] > data["trend"].iloc[-1] and data["close"].iloc[-2] < data["trend"].iloc[-2]:
-            return {"price": last_candle["close"], "type": "bullish"}
-        elif last_candle["close"] < data["trend"].iloc[-1] and data["close"].iloc[-2] > data["trend"].iloc[-2]:
-            return {"price": last_candle["close"], "type": "bearish"}
-        return None
-
-    async def _trade_order_block(self, ob: Dict, data: pd.DataFrame) -> None:
-        direction = "BUY" if ob["type"] == "bullish" else "SELL"
-        sl, tp = self.sl_tp_calculator.calculate_sl_tp(data, ob["price"], direction)
-        size = self.risk_manager.calculate_position_size(ob["price"], sl)
-
-        if size == 0.0:
-            return
-
-        await self.order_manager.place_order(self.symbol, direction, size, ob["price"], sl, tp)
-
-    async def _trade_fair_value_gap(self, fvg: Dict, data: pd.DataFrame) -> None:
-        direction = "BUY" if fvg["type"] == "bullish" else "SELL"
-        sl, tp = self.sl_tp_calculator.calculate_sl_tp(data, fvg["price"], direction)
-        size = self.risk_manager.calculate_position_size(fvg["price"], sl)
-
-        if size == 0.0:
-            return
-
-        await self.order_manager.place_order(self.symbol, direction, size, fvg["price"], sl, tp)
-
-    async def _trade_liquidity_grab(self, liquidity: Dict, data: pd.DataFrame) -> None:
-        direction = "BUY" if liquidity["type"] == "bullish" else "SELL"
-        sl, tp = self.sl_tp_calculator.calculate_sl_tp(data, liquidity["price"], direction)
-        size = self.risk_manager.calculate_position_size(liquidity["price"], sl)
-
-        if size == 0.0:
-            return
-
-        await self.order_manager.place_order(self.symbol, direction, size, liquidity["price"], sl, tp)
-
-    async def _trade_break_of_structure(self, bos: Dict, data: pd.DataFrame) -> None:
-        direction = "BUY" if bos["type"] == "bullish" else "SELL"
-        sl, tp = self.sl_tp_calculator.calculate_sl_tp(data, bos["price"], direction)
-        size = self.risk_manager.calculate_position_size(bos["price"], sl)
-
-        if size == 0.0:
-            return
-
-        await self.order_manager.place_order(self.symbol, direction, size, bos["price"], sl, tp)
-
-    async def _trade_change_of_character(self, choch: Dict, data: pd.DataFrame) -> None:
-        direction = "BUY" if choch["type"] == "bullish" else "SELL"
-        sl, tp = self.sl_tp_calculator.calculate_sl_tp(data, choch["price"], direction)
-        size = self.risk_manager.calculate_position_size(choch["price"], sl)
-
-        if size == 0.0:
-            return
-
-        await self.order_manager.place_order(self.symbol, direction, size, choch["price"], sl, tp)
\ No newline at end of file
+            self.logger.error(f"SMC strategy error: {e}")
\ No newline at end of file